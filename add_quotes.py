@@ -3,6 +3,10 @@ import json
 import pathlib
 from typing import Dict, Tuple
 from moderation import validate_quote, normalize
+import tracing
+import store_watch
+from q2b import QUOTES  # built-in quotes, also in the API rotation
+from verse_index import POLICIES, VERSE_DEDUPE_POLICY, VerseIndex, merge_duplicates
 
 BASE_DIR = pathlib.Path(__file__).parent.resolve()
 APPROVED_PATH = BASE_DIR / "quotes_approved.json"
@@ -13,13 +17,15 @@ def _load_json_list(path: pathlib.Path, *, required: bool = False):
         if required:
             raise FileNotFoundError(f"Input file not found: {path}")
         return []
-    data = json.loads(path.read_text(encoding="utf-8"))
+    with tracing.span("pool.load", path=path.name):
+        data = json.loads(path.read_text(encoding="utf-8"))
     if not isinstance(data, list):
         raise ValueError(f"{path} must be a JSON list")
     return data
 
 def _save_json_list(path: pathlib.Path, items):
-    path.write_text(json.dumps(items, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    with tracing.span("store.save", path=path.name, items=len(items)):
+        store_watch.write_atomic(path, json.dumps(items, ensure_ascii=False, indent=2) + "\n")
 
 def _key(q: Dict) -> Tuple[str, str]:
     # normalized (text, author) for duplicate detection
@@ -36,28 +42,32 @@ def import_quotes(input_path: str, dry_run: bool = False, debug: bool = False):
             print(f"[debug] first item: {incoming[0]}")
 
     approved_keys = {_key(q) for q in approved}
+    approved_verses = VerseIndex(QUOTES + approved)
 
     added = rejected = skipped_dupe = 0
     for q in incoming:
-        ok, reasons = validate_quote(q)
+        with tracing.span("moderation.validate"):
+            ok, reasons = validate_quote(q)
         if not ok:
             rejects.append({"quote": q, "reasons": reasons})
             rejected += 1
             continue
 
         k = _key(q)
-        if k in approved_keys:
+        if k in approved_keys or approved_verses.duplicate_of(q) is not None:
             skipped_dupe += 1
             continue
 
         if not dry_run:
             approved.append(q)
             approved_keys.add(k)
+            approved_verses.add(q)
         added += 1
 
     if not dry_run:
         _save_json_list(APPROVED_PATH, approved)
         _save_json_list(REJECTS_PATH, rejects)
+        store_watch.bump()  # tell running API workers to pick up the new quotes
 
     print(f"Approved added: {added}")
     print(f"Rejected: {rejected}")
@@ -65,11 +75,37 @@ def import_quotes(input_path: str, dry_run: bool = False, debug: bool = False):
     print(f"Approved store: {APPROVED_PATH.name}")
     print(f"Rejected log:  {REJECTS_PATH.name}")
 
+def merge_verse_duplicates(policy: str = VERSE_DEDUPE_POLICY, dry_run: bool = False):
+    """One-off pass: keep the first quote per verse (built-ins first) and drop later approved ones."""
+    approved = _load_json_list(APPROVED_PATH)
+    kept, merged = merge_duplicates(approved, policy, keep=QUOTES)
+    for dropped, original in merged:
+        source = "built-in" if any(original is q for q in QUOTES) else "approved"
+        print(f"  #{dropped} {approved[dropped]['author']!r} -> duplicate of {source} {original['author']!r}")
+    if merged and not dry_run:
+        _save_json_list(APPROVED_PATH, kept)
+        store_watch.bump()
+    print(f"Verse duplicates merged ({policy}): {len(merged)}")
+    print(f"Approved store: {APPROVED_PATH.name}")
+
 if __name__ == "__main__":
     import argparse
     p = argparse.ArgumentParser(description="Import user quotes with moderation")
-    p.add_argument("file", help="Path to JSON file of quotes (list of {text, author, tag})")
+    p.add_argument("file", nargs="?", help="Path to JSON file of quotes (list of {text, author, tag})")
     p.add_argument("--dry-run", action="store_true", help="Validate only; do not write files")
     p.add_argument("--debug", action="store_true", help="Print diagnostics")
+    p.add_argument("--trace", choices=tracing.TRACE_FORMATS, help="Write a trace of the import to QOD_TRACE_DIR")
+    p.add_argument("--merge-verse-duplicates", action="store_true", help="Drop repeated bible verses from the approved store and exit")
+    p.add_argument("--verse-policy", choices=POLICIES, default=VERSE_DEDUPE_POLICY, help="Verse dedupe policy for --merge-verse-duplicates")
     args = p.parse_args()
-    import_quotes(args.file, dry_run=args.dry_run, debug=args.debug)
+    if args.merge_verse_duplicates:
+        merge_verse_duplicates(args.verse_policy, dry_run=args.dry_run)
+        raise SystemExit(0)
+    if not args.file:
+        p.error("file is required unless --merge-verse-duplicates is given")
+    if args.trace:
+        with tracing.start_trace("add_quotes", file=args.file) as trace:
+            import_quotes(args.file, dry_run=args.dry_run, debug=args.debug)
+        print(f"Trace: {trace.write(args.trace)}")
+    else:
+        import_quotes(args.file, dry_run=args.dry_run, debug=args.debug)
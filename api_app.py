@@ -4,49 +4,143 @@ from __future__ import annotations
 import json
 import pathlib
 import hashlib
+import threading
+import time
+import contextlib
 import datetime as dt
-from typing import List, Literal, Optional, Tuple
+from typing import Iterator, List, Literal, Optional, Sequence, Tuple
 from zoneinfo import ZoneInfo
 
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, Header, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
 # Local modules
-from moderation import validate_quote, normalize  # your bible/community rules
+from moderation import validate_quote, normalize, lookup_reference  # your bible/community rules
+from facets import FacetIndex, split_tags
+from verse_index import VerseIndex
+import tracing
+import scripture
+import store_watch
 from q2b import QUOTES  # built-in quotes list lives in q2b.py
 
 # ---------- Config / Paths ----------
 BASE_DIR = pathlib.Path(__file__).parent.resolve()
 APPROVED_PATH = BASE_DIR / "quotes_approved.json"
 
+# JSON responses are built in memory, so keep them small; NDJSON streams any range.
+MAX_JSON_FEED_DAYS = 31
+FEED_CHUNK_DAYS = 512
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
 # ---------- Helpers ----------
 def load_approved_quotes() -> List[dict]:
     if not APPROVED_PATH.exists():
         return []
+    with tracing.span("pool.load", path=APPROVED_PATH.name) as sp:
+        try:
+            raw = APPROVED_PATH.read_text(encoding="utf-8")
+            with tracing.span("pool.parse", bytes=len(raw)):
+                data = json.loads(raw)
+            sp.set(items=len(data) if isinstance(data, list) else 0)
+            return data if isinstance(data, list) else []
+        except Exception:
+            return []
+
+def save_approved_quotes(items: List[dict]) -> Tuple[int, int]:
+    """Save the store and return the (mtime_ns, size) signature of the file we wrote."""
+    with tracing.span("store.save", items=len(items)):
+        st = store_watch.write_atomic(APPROVED_PATH, json.dumps(items, ensure_ascii=False, indent=2) + "\n")
+    store_watch.bump()
+    return (st.st_mtime_ns, st.st_size)
+
+# Facet and verse indexes over built-in + approved quotes; refreshed when the approved store changes.
+_pool_lock = threading.Lock()
+_store_lock = threading.Lock()  # serializes load-append-save in /v1/submit
+_pool_state: dict = {"sig": None, "version": None, "approved": [], "index": None, "verses": None}
+
+# Store / scripture changes from any process (bump() or inotify/polling) move _changes.version().
+_changes = store_watch.ChangeFeed()
+_changes.watch(APPROVED_PATH)
+_changes.watch(scripture.SCRIPTURE_DIR, scripture.reset_stores)
+
+def _store_signature() -> Optional[Tuple[int, int]]:
     try:
-        data = json.loads(APPROVED_PATH.read_text(encoding="utf-8"))
-        return data if isinstance(data, list) else []
-    except Exception:
-        return []
+        st = APPROVED_PATH.stat()
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
 
-def save_approved_quotes(items: List[dict]) -> None:
-    APPROVED_PATH.write_text(
-        json.dumps(items, ensure_ascii=False, indent=2) + "\n",
-        encoding="utf-8",
-    )
+def _refresh_pool() -> dict:
+    """
+    Bring the shared indexes up to date. Nothing touches the filesystem until the change
+    feed's version moves; then, when quotes_approved.json only grew (the usual append-only
+    case) just the new quotes are indexed, otherwise they are rebuilt.
+    """
+    if not _changes.started:
+        _changes.start()
+    version = _changes.version()  # read before loading, so a concurrent write triggers another pass
+    if _pool_state["index"] is not None and version == _pool_state["version"]:
+        return _pool_state
+    with _pool_lock:
+        index = _pool_state["index"]
+        sig = _store_signature()
+        if index is not None and sig == _pool_state["sig"]:
+            _pool_state["version"] = version
+            return _pool_state
+        approved = load_approved_quotes()
+        seen = _pool_state["approved"]
+        verses = _pool_state["verses"]
+        if index is None or approved[:len(seen)] != seen:
+            # mark source for transparency/debug
+            index = FacetIndex({**q, "_src": "built-in"} for q in QUOTES)
+            verses = VerseIndex(QUOTES)
+            seen = []
+        with tracing.span("pool.index", added=len(approved) - len(seen)):
+            delta = approved[len(seen):]
+            index.extend({**q, "_src": "approved"} for q in delta)
+            verses.extend(delta)
+        _pool_state.update(sig=sig, version=version, approved=approved, index=index, verses=verses)
+        return _pool_state
+
+def pool_index() -> FacetIndex:
+    return _refresh_pool()["index"]
 
-def merged_pool(feed: Literal["bible", "community", "both"]) -> List[dict]:
-    built = QUOTES
-    approved = load_approved_quotes()
-    allq: List[dict] = []
-    # mark source for transparency/debug
-    allq.extend([{**q, "_src": "built-in"} for q in built])
-    allq.extend([{**q, "_src": "approved"} for q in approved])
+def verse_index() -> VerseIndex:
+    return _refresh_pool()["verses"]
 
-    if feed == "both":
-        return allq
-    return [q for q in allq if normalize(q.get("tag", "")) == feed]
+def _note_approved(approved: List[dict], sig: Tuple[int, int]) -> None:
+    """
+    Index the quote we just appended and saved, without rereading the file. `sig` is the
+    signature of the file we wrote: if another process has replaced it since, the next
+    _refresh_pool() sees a different signature and reloads.
+    """
+    with _pool_lock:
+        index = _pool_state["index"]
+        if index is None or _pool_state["approved"] != approved[:-1]:
+            return  # already refreshed, or out of sync: pool_index() will catch up
+        index.add({**approved[-1], "_src": "approved"})
+        _pool_state["verses"].add(approved[-1])
+        _pool_state.update(sig=sig, approved=list(approved))
+
+def merged_pool(
+    feed: Literal["bible", "community", "both"],
+    tags: Optional[List[str]] = None,
+    author: Optional[str] = None,
+) -> List[dict]:
+    """Built-in + approved quotes in the feed, narrowed to any of `tags` and to `author` tokens."""
+    if feed != "both":
+        tags = [feed] if tags is None else [t for t in tags if t == feed]
+    return pool_index().select(tags=tags, author=author)
+
+def _no_quotes(feed: str, tags: Optional[List[str]], author: Optional[str]) -> HTTPException:
+    detail = f"No quotes in feed '{feed}'"
+    if tags:
+        detail += f" with tags {', '.join(tags)}"
+    if author:
+        detail += f" by author '{author}'"
+    return HTTPException(404, detail=detail + ".")
 
 def pick_for_date(day: dt.date, items: List[dict]) -> dict:
     if not items:
@@ -54,24 +148,88 @@ def pick_for_date(day: dt.date, items: List[dict]) -> dict:
     idx = day.toordinal() % len(items)
     return items[idx]
 
-def build_feed(start_date: dt.date, days: int, feed: Literal["bible","community","both"]) -> List[dict]:
+def _rotated(items: Sequence, offset: int, count: int) -> list:
+    """Return `count` items walking `items` cyclically from `offset` (slices, no per-item modulo)."""
+    n = len(items)
+    out: list = []
+    i = offset
+    while len(out) < count:
+        take = min(n - i, count - len(out))
+        out.extend(items[i:i + take])
+        i = 0
+    return out
+
+def iter_feed_chunks(
+    start_date: dt.date,
+    end_date: dt.date,
+    items: Sequence,
+    chunk_days: Optional[int] = None,
+) -> Iterator[Tuple[range, list]]:
+    """
+    Yield (ordinals, picks) for start_date..end_date inclusive, at most chunk_days at a time.
+    pick_for_date uses ordinal % len(items), so consecutive days walk the pool in rotation:
+    each chunk's picks are computed from its ordinal range at once instead of day by day.
+    """
+    if not items:
+        return
+    chunk_days = chunk_days or FEED_CHUNK_DAYS
+    n = len(items)
+    first, last = start_date.toordinal(), end_date.toordinal()
+    for lo in range(first, last + 1, chunk_days):
+        hi = min(lo + chunk_days, last + 1)
+        yield range(lo, hi), _rotated(items, lo % n, hi - lo)
+
+def feed_end_date(start_date: dt.date, days: int) -> dt.date:
+    """Last day of a `days`-long range starting at start_date, clamped to date.max."""
+    return start_date + dt.timedelta(days=min(days - 1, (dt.date.max - start_date).days))
+
+def _feed_entry(q: dict) -> dict:
+    return {
+        "text": q["text"],
+        "author": q["author"],
+        "tag": q.get("tag", ""),
+        "source": q.get("_src", "?"),
+    }
+
+def build_feed(
+    start_date: dt.date,
+    days: int,
+    feed: Literal["bible","community","both"],
+    tags: Optional[List[str]] = None,
+    author: Optional[str] = None,
+) -> List[dict]:
     """Return a list of quotes for consecutive days starting at start_date."""
-    pool = merged_pool(feed)
+    pool = merged_pool(feed, tags, author)
     if not pool:
         return []
+    end_date = feed_end_date(start_date, days)
     out: List[dict] = []
-    for i in range(days):
-        day = start_date + dt.timedelta(days=i)
-        q = pick_for_date(day, pool)
-        out.append({
-            "date": day.isoformat(),
-            "text": q["text"],
-            "author": q["author"],
-            "tag": q.get("tag", ""),
-            "source": q.get("_src", "?"),
-        })
+    for ordinals, picks in iter_feed_chunks(start_date, end_date, pool):
+        out.extend(
+            {"date": dt.date.fromordinal(o).isoformat(), **_feed_entry(q)}
+            for o, q in zip(ordinals, picks)
+        )
     return out
 
+def iter_feed_ndjson(start_date: dt.date, end_date: dt.date, pool: List[dict]) -> Iterator[bytes]:
+    """Yield the feed as NDJSON, one encoded chunk of lines at a time (memory bounded by pool size)."""
+    # Serialize each picked entry once (rotating over pool positions); per day only the date is formatted.
+    frags: dict = {}
+
+    def frag(i: int) -> str:
+        f = frags.get(i)
+        if f is None:
+            f = frags[i] = json.dumps(_feed_entry(pool[i]), ensure_ascii=False)[1:]
+        return f
+
+    for ordinals, picks in iter_feed_chunks(start_date, end_date, range(len(pool))):
+        with tracing.span("feed.chunk", days=len(ordinals)):
+            chunk = "".join(
+                f'{{"date":"{dt.date.fromordinal(o).isoformat()}",{frag(i)}\n'
+                for o, i in zip(ordinals, picks)
+            ).encode("utf-8")
+        yield chunk
+
 def parse_date_in_tz(tz_name: Optional[str]) -> Tuple[dt.date, str]:
     tz = None
     if tz_name:
@@ -93,7 +251,7 @@ def key_for(q: dict) -> str:
 
 # ---------- Schemas ----------
 class QuoteIn(BaseModel):
-    text: str
+    text: str = Field("", description="May be omitted for 'bible' quotes; the verse is read from the local scripture store.")
     author: str
     tag: str = Field(description="Use 'bible' for scripture; anything else will be treated as 'community'.")
 
@@ -121,6 +279,42 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+class TraceMiddleware:
+    """
+    Per-request trace file and, when asked for, a sampling profile kept only for slow requests.
+    Pure ASGI so the trace ends after the last body chunk, covering streamed NDJSON feeds.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        header = dict(scope["headers"]).get(b"x-qod-profile")
+        profile = tracing.profile_requested(header.decode("latin-1") if header is not None else None)
+        if not (tracing.TRACE_FORMAT or profile):
+            return await self.app(scope, receive, send)
+
+        started = time.perf_counter()
+        with tracing.start_trace("request", method=scope["method"], path=scope["path"]) as trace:
+            async def send_with_id(message):
+                if message["type"] == "http.response.start":
+                    message["headers"] = list(message.get("headers", [])) + [(b"x-qod-trace-id", trace.trace_id.encode())]
+                await send(message)
+
+            with tracing.SamplingProfiler(trace) if profile else contextlib.nullcontext() as profiler:
+                await self.app(scope, receive, send_with_id)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if tracing.TRACE_FORMAT:
+            trace.write(tracing.TRACE_FORMAT)
+        if profiler is not None and elapsed_ms >= tracing.PROFILE_SLOW_MS:
+            profiler.write()
+
+# Only installed when QOD_TRACE / QOD_PROFILE / QOD_ADMIN_TOKEN is set, so it costs nothing otherwise.
+if tracing.enabled():
+    app.add_middleware(TraceMiddleware)
+
 @app.get("/health")
 def health():
     return {"ok": True}
@@ -135,12 +329,18 @@ def root():
     }
 
 @app.get("/v1/qod", response_model=QuoteOut)
-def qod(feed: Literal["bible", "community", "both"] = "bible", tz: Optional[str] = None):
+def qod(
+    feed: Literal["bible", "community", "both"] = "bible",
+    tz: Optional[str] = None,
+    tags: Optional[str] = Query(None, description="Comma-separated tags; matches any (use feed=both for non-feed tags)."),
+    author: Optional[str] = Query(None, description="Author words that must all appear, e.g. 'les brown'."),
+):
     """Return today's deterministic quote for the selected feed, using the local date in tz."""
     today, final_tz = parse_date_in_tz(tz)
-    pool = merged_pool(feed)
+    tag_list = split_tags(tags)
+    pool = merged_pool(feed, tag_list, author)
     if not pool:
-        raise HTTPException(404, detail=f"No quotes in feed '{feed}'.")
+        raise _no_quotes(feed, tag_list, author)
     q = pick_for_date(today, pool)
     return QuoteOut(
         date=today,
@@ -174,45 +374,101 @@ def pick(date: str, feed: Literal["bible", "community", "both"] = "bible", tz: O
         source=q.get("_src", "?"),
     )
 
+def _parse_day(value: str, name: str) -> dt.date:
+    try:
+        return dt.date.fromisoformat(value)
+    except Exception:
+        raise HTTPException(400, detail=f"Invalid {name}; expected YYYY-MM-DD.")
+
 @app.get("/v1/feed")
 def feed(
-    days: int = Query(7, ge=1, le=31),
+    days: int = Query(7, ge=1, le=MAX_JSON_FEED_DAYS),
     feed: Literal["bible","community","both"] = "bible",
-    tz: Optional[str] = None
+    tz: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    format: Literal["json", "ndjson"] = "json",
+    accept: Optional[str] = Header(None),
+    tags: Optional[str] = Query(None, description="Comma-separated tags; matches any (use feed=both for non-feed tags)."),
+    author: Optional[str] = Query(None, description="Author words that must all appear, e.g. 'les brown'."),
 ):
-    """Return N days of deterministic picks starting from 'today' in tz."""
+    """
+    Return deterministic picks for a range of days.
+    Without start/end the range is N days from 'today' in tz; `start` alone also uses N days.
+    JSON responses are capped at 31 days; use format=ndjson (or Accept: application/x-ndjson)
+    to stream arbitrary ranges, one {"date", "text", "author", "tag", "source"} object per line.
+    """
     today, final_tz = parse_date_in_tz(tz)
-    items = build_feed(today, days, feed)
+    start_date = _parse_day(start, "start") if start else today
+    if end:
+        end_date = _parse_day(end, "end")
+        if end_date < start_date:
+            raise HTTPException(400, detail="end must not be before start.")
+    else:
+        end_date = feed_end_date(start_date, days)
+    span_days = (end_date - start_date).days + 1
+    tag_list = split_tags(tags)
+
+    if format == "ndjson" or (accept and NDJSON_MEDIA_TYPE in accept):
+        pool = merged_pool(feed, tag_list, author)
+        if not pool:
+            raise _no_quotes(feed, tag_list, author)
+        return StreamingResponse(
+            iter_feed_ndjson(start_date, end_date, pool),
+            media_type=NDJSON_MEDIA_TYPE,
+            headers={"X-Feed-Days": str(span_days), "X-Feed-TZ": final_tz},
+        )
+
+    if span_days > MAX_JSON_FEED_DAYS:
+        raise HTTPException(
+            400,
+            detail=f"JSON feeds are limited to {MAX_JSON_FEED_DAYS} days; use format=ndjson for longer ranges.",
+        )
+    items = build_feed(start_date, span_days, feed, tag_list, author)
     if not items:
-        raise HTTPException(404, detail=f"No quotes in feed '{feed}'.")
-    return {"tz": final_tz, "days": days, "feed": feed, "items": items}
+        raise _no_quotes(feed, tag_list, author)
+    return {"tz": final_tz, "days": span_days, "feed": feed, "items": items}
 
 @app.post("/v1/submit", response_model=SubmitResult)
 def submit(q: QuoteIn, auto_store: bool = True):
     """
     Submit a quote. If tag != 'bible', it's treated as 'community' (Bible is reserved for scripture).
     We run your moderation.validate_quote. If accepted and not a duplicate, we append to quotes_approved.json.
+    Bible quotes may be sent as a reference only ('John 3:16'); the text comes from the scripture store.
     """
     # Map non-bible to community (respect your bible-first design)
     tag_norm = normalize(q.tag)
     effective = q.model_dump()
     if tag_norm != "bible":
         effective = {**effective, "orig_tag": q.tag, "tag": "community"}
+    elif not q.text.strip():
+        # Reference-only submission: fill in the verse from the offline store
+        with tracing.span("scripture.lookup"):
+            verse = lookup_reference(q.author)
+        if verse is None:
+            return SubmitResult(accepted=False, reasons=[f"verse text not available for reference '{q.author}'"])
+        effective["text"] = verse
 
-    ok, reasons = validate_quote(effective)
+    with tracing.span("moderation.validate", tag=normalize(effective["tag"])) as sp:
+        ok, reasons = validate_quote(effective)
+        sp.set(accepted=ok)
     if not ok:
         return SubmitResult(accepted=False, reasons=reasons)
 
-    # Deduplicate
-    approved = load_approved_quotes()
-    existing = {key_for(item) for item in approved}
-    k = key_for(effective)
-    if k in existing:
-        # Treat as accepted but duplicate (no write)
-        return SubmitResult(accepted=True, stored_as=normalize(effective["tag"]))
-
-    if auto_store:
-        approved.append(effective)
-        save_approved_quotes(approved)
+    # Deduplicate and store under one lock so concurrent submits in this worker don't lose appends
+    with _store_lock:
+        approved = load_approved_quotes()
+        with tracing.span("dedupe.key_for", items=len(approved)):
+            existing = {key_for(item) for item in approved}
+            k = key_for(effective)
+        # Same verse already in rotation ('John 3:16' vs 'john  3:16 (KJV)') counts as a duplicate too
+        if k in existing or verse_index().duplicate_of(effective) is not None:
+            # Treat as accepted but duplicate (no write)
+            return SubmitResult(accepted=True, stored_as=normalize(effective["tag"]))
+
+        if auto_store:
+            approved.append(effective)
+            sig = save_approved_quotes(approved)
+            _note_approved(approved, sig)
 
     return SubmitResult(accepted=True, stored_as=normalize(effective["tag"]))
@@ -0,0 +1,97 @@
+# facets.py
+import heapq
+import re
+from typing import Dict, Iterable, List, Optional
+
+from moderation import normalize
+
+TOKEN_RE = re.compile(r"\w+")
+
+def author_tokens(author: str) -> List[str]:
+    """'John 3:16 (KJV)' -> ['john', '3', '16', 'kjv']"""
+    return TOKEN_RE.findall(normalize(author or ""))
+
+def split_tags(raw: Optional[str]) -> Optional[List[str]]:
+    """Parse a comma-separated tag list ('bible, movies'); None/blank means no tag filter."""
+    if not raw:
+        return None
+    tags = [normalize(t) for t in raw.split(",") if t.strip()]
+    return tags or None
+
+def _intersect(a: List[int], b: List[int]) -> List[int]:
+    # both sorted ascending
+    out: List[int] = []
+    i = j = 0
+    while i < len(a) and j < len(b):
+        if a[i] == b[j]:
+            out.append(a[i])
+            i += 1
+            j += 1
+        elif a[i] < b[j]:
+            i += 1
+        else:
+            j += 1
+    return out
+
+def _union(lists: Iterable[List[int]]) -> List[int]:
+    out: List[int] = []
+    for i in heapq.merge(*lists):
+        if not out or out[-1] != i:
+            out.append(i)
+    return out
+
+class FacetIndex:
+    """
+    Inverted indexes over a quote pool: normalized tag -> ids and author token -> ids.
+    Ids are positions in `quotes`, so posting lists stay sorted as quotes are appended
+    and selections come back in pool order (picks stay deterministic).
+    """
+
+    def __init__(self, quotes: Iterable[dict] = ()):
+        self.quotes: List[dict] = []
+        self._by_tag: Dict[str, List[int]] = {}
+        self._by_author_token: Dict[str, List[int]] = {}
+        self.extend(quotes)
+
+    def __len__(self) -> int:
+        return len(self.quotes)
+
+    def add(self, q: dict) -> int:
+        qid = len(self.quotes)
+        self.quotes.append(q)
+        self._by_tag.setdefault(normalize(q.get("tag", "")), []).append(qid)
+        for tok in dict.fromkeys(author_tokens(q.get("author", ""))):
+            self._by_author_token.setdefault(tok, []).append(qid)
+        return qid
+
+    def extend(self, quotes: Iterable[dict]) -> None:
+        for q in quotes:
+            self.add(q)
+
+    def tags(self) -> List[str]:
+        return sorted(t for t in self._by_tag if t)
+
+    def ids(
+        self,
+        tags: Optional[Iterable[str]] = None,
+        author: Optional[str] = None,
+        within: Optional[List[int]] = None,
+    ) -> List[int]:
+        """
+        Sorted ids matching ANY of `tags` and ALL tokens of `author` (e.g. 'les brown'),
+        optionally restricted to the sorted id list `within`. None means no constraint.
+        """
+        result = within
+        if tags is not None:
+            tag_ids = _union(self._by_tag.get(normalize(t), []) for t in tags)
+            result = tag_ids if result is None else _intersect(result, tag_ids)
+        if author is not None:
+            postings = [self._by_author_token.get(tok, []) for tok in author_tokens(author)]
+            for ids in sorted(postings, key=len):
+                result = ids if result is None else _intersect(result, ids)
+        if result is None:
+            return list(range(len(self.quotes)))
+        return result
+
+    def select(self, tags: Optional[Iterable[str]] = None, author: Optional[str] = None) -> List[dict]:
+        return [self.quotes[i] for i in self.ids(tags=tags, author=author)]
@@ -2,6 +2,9 @@
 import re
 from typing import Tuple, List, Dict, Optional
 
+import tracing
+from scripture import get_store
+
 # Regex: "Book Chapter:Verse" with optional translation in parentheses.
 REF_RE = re.compile(
     r"""^\s*
@@ -41,6 +44,9 @@ KNOWN_BOOKS = {
 URL_RE = re.compile(r"https?://|www\.", re.I)
 EMAIL_RE = re.compile(r"[A-Z0-9._%+-]+@[A-Z0-9.-]+\.[A-Z]{2,}", re.I)
 
+# Verse checks: an excerpt must be the whole verse or at least this many consecutive words of it
+MIN_EXCERPT_WORDS = 6
+
 # Bible is default; community is for non‑Bible user submissions
 ALLOWED_TAGS = {"bible", "community"}
 
@@ -67,6 +73,30 @@ def parse_scripture_reference(author_field: str) -> Optional[Tuple[str, int, int
     trans = m.group("trans")
     return (book, chap, verse, trans)
 
+def lookup_reference(author_field: str) -> Optional[str]:
+    """Return the verse text for 'Book C:V (TRANS)' from the local scripture store (default KJV), if installed."""
+    parsed = parse_scripture_reference(author_field)
+    if not parsed:
+        return None
+    book, chap, verse, trans = parsed
+    store = get_store(trans)
+    return store.lookup(book, chap, verse) if store else None
+
+def _words(s: str) -> str:
+    return " ".join(re.findall(r"[a-z0-9']+", s.lower().replace("’", "'")))
+
+def text_matches_verse(text: str, verse_text: str) -> bool:
+    """
+    True if text is the verse, or an excerpt of at least MIN_EXCERPT_WORDS consecutive words
+    ('For God so loved the world...'), ignoring punctuation/case.
+    """
+    t, v = _words(text), _words(verse_text)
+    if not t:
+        return False
+    if t == v:
+        return True
+    return len(t.split()) >= MIN_EXCERPT_WORDS and f" {t} " in f" {v} "
+
 def _find_banned(text: str) -> List[str]:
     t = normalize(text)
     return [w for w in BANNED_WORDS if w in t]
@@ -95,7 +125,8 @@ def validate_quote(q: Dict) -> Tuple[bool, List[str]]:
     # Length gates
     if len(text) < 4:
         reasons.append("text too short")
-    if len(text) > 500:
+    if len(text) > 500 and not (normalize(tag) == "bible" and text == lookup_reference(author)):
+        # verses taken verbatim from the scripture store may be longer (e.g. Esther 8:9)
         reasons.append("text too long")
     if len(author) > 120:
         reasons.append("author too long")
@@ -140,5 +171,16 @@ def validate_quote(q: Dict) -> Tuple[bool, List[str]]:
                 reasons.append(f"unknown scripture book: '{book}' (sample known: {sample})")
             if chap <= 0 or verse <= 0:
                 reasons.append("chapter and verse must be positive integers")
+            elif book in KNOWN_BOOKS:
+                # Check against the offline text when this translation is installed
+                store = get_store(trans)
+                if store is not None and store.has_book(book):
+                    with tracing.span("moderation.scripture", translation=store.translation):
+                        actual = store.lookup(book, chap, verse)
+                    ref = f"{book} {chap}:{verse} ({store.translation})"
+                    if actual is None:
+                        reasons.append(f"no such verse: {ref}")
+                    elif not text_matches_verse(text, actual):
+                        reasons.append(f"text does not match {ref}")
 
     return (len(reasons) == 0), reasons
@@ -1,6 +1,8 @@
 import argparse
 import datetime
 
+from facets import FacetIndex
+
 QUOTES = [
     {"text": "Programs must be written for people to read.", "author": "Harold Abelson", "tag": "tech"},
     {"text": "The fear of the LORD is the beginning of wisdom.", "author": "Proverbs 9:10 (KJV)", "tag": "bible"},
@@ -36,29 +38,30 @@ def main():
     parser.add_argument("--debug", action="store_true", help="print filter diagnostics")
     args = parser.parse_args()
     
-    pool = QUOTES
-    
+    index = FacetIndex(QUOTES)
+    ids = index.ids()
+
     #1) tag filter
     if args.tag:
-        t = normalize(args.tag)
-        filtered = [q for q in pool if normalize(q.get("tag", "")) == t]
+        filtered = index.ids(tags=[args.tag])
         if args.debug:
             print(f"[debug] tag='{args.tag}' matches: {len(filtered)}")
         if not filtered:
             print(f"(no matches for tag '{args.tag}', using all quotes)")
-        pool = filtered or pool
+        ids = filtered or ids
 
     #2) author filter
     if args.author:
-        a = normalize(args.author)
-        filtered = [q for q in pool if a in normalize(q.get("author", ""))]
+        filtered = index.ids(author=args.author, within=ids)
         if args.debug:
             print(f"[debug] author contains '{args.author}' matches: {len(filtered)}")
             if filtered:
-                print("[debug] authors in pool:", sorted({q['author'] for q in filtered}))
+                print("[debug] authors in pool:", sorted({index.quotes[i]['author'] for i in filtered}))
         if not filtered:
             print(f"(no matches for author '{args.author}', using current pool)")
-        pool = filtered or pool
+        ids = filtered or ids
+
+    pool = [index.quotes[i] for i in ids]
 
     if not pool:
         raise SystemExit("No quotes available after filtering.")
@@ -2,6 +2,8 @@ import argparse
 import datetime
 import json, pathlib
 
+from facets import FacetIndex
+
 QUOTES = [
     {"text": "Programs must be written for people to read.", "author": "Harold Abelson", "tag": "tech"},
     {"text": "The fear of the LORD is the beginning of wisdom.", "author": "Proverbs 9:10 (KJV)", "tag": "bible"},
@@ -39,15 +41,8 @@ def pick_for_date(date, items):
 def available_tags():
     return sorted({normalize(q.get("tag", "")) for q in QUOTES if q.get("tag")})
 
-def filter_by_tags(pool, tags_norm: set[str]):
-    return [q for q in pool if normalize(q.get("tag", "")) in tags_norm]
-
-def filter_by_author(pool, author_text: str):
-    a = normalize(author_text)
-    return [q for q in pool if a in normalize(q.get("author", ""))]
-
-def interactive_choose_tags():
-    tags = available_tags()
+def interactive_choose_tags(tags=None):
+    tags = tags or available_tags()
     print("\nChoose a category (or multiple, comma-separated):")
     for i, t in enumerate(tags, 1):
         print(f"  {i}. {t}")
@@ -73,42 +68,44 @@ def main():
         return
     
     approved = load_approved_quotes()
-    pool = QUOTES + approved
-    
+    index = FacetIndex(QUOTES + approved)
+    ids = index.ids()
+
     if args.debug:
-        print(f"[debug] start pool size: {len(pool)}")
+        print(f"[debug] start pool size: {len(ids)}")
 
     # Category selection (one or many)
     if args.categories:
         selected = {normalize(x) for x in args.categories.split(",") if x.strip()}
     else:
-        selected = interactive_choose_tags()
+        selected = interactive_choose_tags(index.tags())
 
     if selected:
-        valid = set(available_tags())
+        valid = set(index.tags())
         unknown = selected - valid
         if unknown and args.debug:
             print(f"[debug] unknown categories ignored: {sorted(unknown)}")
         wanted = selected & valid
         if wanted:
-            filtered = filter_by_tags(pool, wanted)
+            filtered = index.ids(tags=wanted, within=ids)
             if args.debug:
                 print(f"[debug] categories={sorted(wanted)} matches: {len(filtered)}")
             if filtered:
-                pool = filtered
+                ids = filtered
         if args.debug:
-            print(f"[debug] pool size now: {len(pool)}")
+            print(f"[debug] pool size now: {len(ids)}")
 
     # Optional author filter
     if args.author:
-        filtered = filter_by_author(pool, args.author)
+        filtered = index.ids(author=args.author, within=ids)
         if args.debug:
             print(f"[debug] author contains '{args.author}' matches: {len(filtered)}")
         if filtered:
-            pool = filtered
+            ids = filtered
         if args.debug:
-            print(f"[debug] pool size now: {len(pool)}")
+            print(f"[debug] pool size now: {len(ids)}")
 
+    pool = [index.quotes[i] for i in ids]
     if not pool:
         raise SystemExit("No quotes available after filtering.")
 
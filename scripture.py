@@ -0,0 +1,192 @@
+# scripture.py
+"""
+Offline scripture text store, one file per translation (scripture/kjv.qsx).
+
+Layout (little-endian):
+    header   "<4sHI"  magic, number of books, number of chapter slots
+    books    per book: u8 name length, name (utf-8, normalized), "<HI" chapters, first slot
+    chapters per slot "<IIH": data offset, data length, verse count
+    data     one zlib block per chapter: its verses joined by "\\n"
+
+The file is memory-mapped; a lookup reads one fixed-size chapter slot and
+inflates a single chapter, so the whole Bible is never loaded.
+"""
+import mmap
+import os
+import pathlib
+import struct
+import tempfile
+import threading
+import zlib
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+BASE_DIR = pathlib.Path(__file__).parent.resolve()
+SCRIPTURE_DIR = BASE_DIR / "scripture"
+DEFAULT_TRANSLATION = "KJV"
+
+MAGIC = b"QSX1"
+HEADER = struct.Struct("<4sHI")
+BOOK = struct.Struct("<HI")
+SLOT = struct.Struct("<IIH")
+
+def normalize_book(name: str) -> str:
+    return " ".join(name.lower().split())
+
+def store_path(translation: Optional[str] = None) -> pathlib.Path:
+    return SCRIPTURE_DIR / f"{(translation or DEFAULT_TRANSLATION).lower()}.qsx"
+
+class ScriptureStore:
+    def __init__(self, path: pathlib.Path, translation: str):
+        self.path = path
+        self.translation = translation.upper()
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, nbooks, _nslots = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a scripture store")
+        self._books: Dict[str, Tuple[int, int]] = {}  # book -> (chapters, first slot)
+        pos = HEADER.size
+        for _ in range(nbooks):
+            n = self._mm[pos]
+            name = self._mm[pos + 1:pos + 1 + n].decode("utf-8")
+            pos += 1 + n
+            self._books[name] = BOOK.unpack_from(self._mm, pos)
+            pos += BOOK.size
+        self._slots_at = pos
+        self._chapter = lru_cache(maxsize=64)(self._load_chapter)
+        self._lock = threading.Lock()  # lookups vs close() from another thread
+
+    def books(self) -> List[str]:
+        return list(self._books)
+
+    def has_book(self, book: str) -> bool:
+        return normalize_book(book) in self._books
+
+    def _load_chapter(self, slot: int) -> List[str]:
+        offset, length, _nverses = SLOT.unpack_from(self._mm, self._slots_at + slot * SLOT.size)
+        return zlib.decompress(self._mm[offset:offset + length]).decode("utf-8").split("\n")
+
+    def lookup(self, book: str, chap: int, verse: int) -> Optional[str]:
+        """Return the verse text, or None if the reference does not exist in this translation."""
+        with self._lock:
+            if not self._mm.closed:
+                return self._lookup(book, chap, verse)
+        # Closed because the file was replaced: answer from the current one
+        current = get_store(self.translation)
+        if current is None or current is self:
+            return None
+        return current.lookup(book, chap, verse)
+
+    def _lookup(self, book: str, chap: int, verse: int) -> Optional[str]:
+        entry = self._books.get(normalize_book(book))
+        if entry is None:
+            return None
+        nchapters, first = entry
+        if not 1 <= chap <= nchapters:
+            return None
+        slot = first + chap - 1
+        _offset, _length, nverses = SLOT.unpack_from(self._mm, self._slots_at + slot * SLOT.size)
+        if not 1 <= verse <= nverses:
+            return None
+        return self._chapter(slot)[verse - 1] or None
+
+    def close(self) -> None:
+        with self._lock:
+            self._mm.close()
+
+_stores: Dict[pathlib.Path, ScriptureStore] = {}
+
+def get_store(translation: Optional[str] = None) -> Optional[ScriptureStore]:
+    """Open (once) the store for a translation; None if it is not installed."""
+    path = store_path(translation)
+    store = _stores.get(path)
+    if store is None:
+        if not path.exists():
+            return None
+        store = _stores[path] = ScriptureStore(path, translation or DEFAULT_TRANSLATION)
+    return store
+
+def reset_stores() -> None:
+    """Close opened stores so the next get_store() sees rebuilt or newly installed files."""
+    for path in list(_stores):
+        store = _stores.pop(path, None)
+        if store is not None:
+            store.close()  # in-flight lookups on it fall through to the new file
+
+def build_store(verses: Iterable[Tuple[str, int, int, str]], out_path: pathlib.Path) -> int:
+    """Write a store from (book, chapter, verse, text) rows in canonical book order; return verse count."""
+    books: Dict[str, Dict[int, Dict[int, str]]] = {}
+    count = 0
+    for book, chap, verse, text in verses:
+        books.setdefault(normalize_book(book), {}).setdefault(chap, {})[verse] = " ".join(text.split())
+        count += 1
+
+    book_table = b""
+    slots: List[Tuple[bytes, int]] = []
+    for name, chapters in books.items():
+        raw = name.encode("utf-8")
+        nchap = max(chapters)
+        book_table += bytes([len(raw)]) + raw + BOOK.pack(nchap, len(slots))
+        for c in range(1, nchap + 1):
+            vs = chapters.get(c, {})
+            nverses = max(vs) if vs else 0
+            blob = "\n".join(vs.get(v, "") for v in range(1, nverses + 1)).encode("utf-8")
+            slots.append((zlib.compress(blob, 9), nverses))
+
+    offset = HEADER.size + len(book_table) + SLOT.size * len(slots)
+    slot_table = b""
+    for blob, nverses in slots:
+        slot_table += SLOT.pack(offset, len(blob), nverses)
+        offset += len(blob)
+
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    # Running workers have the old file mapped; truncating it in place would SIGBUS them,
+    # so write a new file and rename it over the old one.
+    fd, tmp = tempfile.mkstemp(dir=out_path.parent, prefix=f".{out_path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(HEADER.pack(MAGIC, len(books), len(slots)))
+            f.write(book_table)
+            f.write(slot_table)
+            for blob, _ in slots:
+                f.write(blob)
+        os.replace(tmp, out_path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    old = _stores.pop(out_path, None)
+    if old is not None:
+        old.close()
+    return count
+
+def read_tsv(path: pathlib.Path) -> Iterable[Tuple[str, int, int, str]]:
+    """Rows of 'Book<TAB>chapter<TAB>verse<TAB>text', e.g. 'John\\t3\\t16\\tFor God so loved...'."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip() or line.startswith("#"):
+                continue
+            book, chap, verse, text = line.rstrip("\n").split("\t", 3)
+            yield book, int(chap), int(verse), text
+
+if __name__ == "__main__":
+    import argparse
+    p = argparse.ArgumentParser(description="Build or query the offline scripture store")
+    sub = p.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build", help="compile a TSV corpus (Book, chapter, verse, text)")
+    b.add_argument("file")
+    b.add_argument("--translation", default=DEFAULT_TRANSLATION)
+    q = sub.add_parser("lookup", help="print the verse for a reference, e.g. 'John 3:16 (KJV)'")
+    q.add_argument("reference")
+    args = p.parse_args()
+
+    if args.cmd == "build":
+        out = store_path(args.translation)
+        n = build_store(read_tsv(pathlib.Path(args.file)), out)
+        print(f"Stored {n} verses in {out} ({out.stat().st_size} bytes)")
+    else:
+        from moderation import lookup_reference
+        text = lookup_reference(args.reference)
+        if text is None:
+            raise SystemExit(f"Not found: {args.reference}")
+        print(text)
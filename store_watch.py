@@ -0,0 +1,229 @@
+# store_watch.py
+"""
+Cross-process change notification for the quote store.
+
+Writers (api_app, add_quotes) call bump() after saving: it increments a u64
+generation in a small memory-mapped file shared by every process. Each process
+that serves reads also runs a ChangeFeed watcher thread (inotify on Linux,
+stat polling elsewhere) to catch edits made without bump(). version() is two
+memory reads, so readers can check it on every request without touching the
+filesystem and reload only when it moved.
+
+    QOD_WATCH_POLL_S=1.0   polling interval (worst-case staleness) without inotify
+"""
+import ctypes
+import ctypes.util
+import mmap
+import os
+import pathlib
+import select
+import struct
+import tempfile
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # not on Windows; bumps are then unlocked
+    fcntl = None
+
+BASE_DIR = pathlib.Path(__file__).parent.resolve()
+GENERATION_PATH = BASE_DIR / ".quotes_generation"
+POLL_INTERVAL_S = float(os.environ.get("QOD_WATCH_POLL_S") or 1.0)
+
+COUNTER = struct.Struct("<Q")
+
+# <sys/inotify.h>
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT = struct.Struct("iIII")  # wd, mask, cookie, len
+
+class Generation:
+    """A u64 counter in a shared memory-mapped file."""
+
+    def __init__(self, path: pathlib.Path = GENERATION_PATH):
+        self.path = path
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size < COUNTER.size:
+                os.ftruncate(fd, COUNTER.size)
+            self._mm = mmap.mmap(fd, COUNTER.size)
+        finally:
+            os.close(fd)
+
+    @property
+    def value(self) -> int:
+        return COUNTER.unpack_from(self._mm, 0)[0]
+
+    def bump(self) -> int:
+        with open(self.path, "rb+") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)  # released on close
+            value = self.value + 1
+            COUNTER.pack_into(self._mm, 0, value)
+        return value
+
+_generations: Dict[pathlib.Path, Generation] = {}
+
+def generation(path: pathlib.Path = GENERATION_PATH) -> Generation:
+    gen = _generations.get(path)
+    if gen is None:
+        gen = _generations[path] = Generation(path)
+    return gen
+
+def bump(path: pathlib.Path = GENERATION_PATH) -> int:
+    """Tell every process sharing `path` that the store changed."""
+    return generation(path).bump()
+
+def write_atomic(path: pathlib.Path, text: str) -> os.stat_result:
+    """
+    Write via a unique temp file + rename, so readers in any process never see a half-written file.
+    Returns the stat of the file we wrote (taken before the rename, so it can't be another writer's).
+    """
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            st = os.fstat(f.fileno())
+        os.replace(tmp, path)
+        return st
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+class _Inotify:
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._libc = libc
+        self.fd = libc.inotify_init1(IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    def add_watch(self, directory: pathlib.Path) -> int:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(str(directory)), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+        return wd
+
+    def read(self) -> List[Tuple[int, str]]:
+        data = os.read(self.fd, 64 * 1024)
+        events = []
+        pos = 0
+        while pos < len(data):
+            wd, _mask, _cookie, n = EVENT.unpack_from(data, pos)
+            pos += EVENT.size
+            name = data[pos:pos + n].rstrip(b"\0").decode("utf-8", "replace")
+            pos += n
+            events.append((wd, name))
+        return events
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+def _snapshot(path: pathlib.Path):
+    try:
+        if path.is_dir():
+            return tuple(sorted((p.name, p.stat().st_mtime_ns, p.stat().st_size) for p in path.iterdir()))
+        st = path.stat()
+        return (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+class ChangeFeed:
+    """
+    Watch files/directories and expose a version that moves whenever any of them
+    (or the shared generation) changes. Callbacks run on the watcher thread.
+    """
+
+    def __init__(self, gen: Optional[Generation] = None, poll_interval: float = POLL_INTERVAL_S):
+        self.generation = gen or generation()
+        self.poll_interval = poll_interval
+        self.mode: Optional[str] = None  # 'inotify' | 'poll' once started
+        self._watched: Dict[pathlib.Path, List[Callable[[], None]]] = {}
+        self._events = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def watch(self, path: pathlib.Path, callback: Optional[Callable[[], None]] = None) -> None:
+        """Register a file or directory; call before start()."""
+        self._watched.setdefault(pathlib.Path(path), []).extend([callback] if callback else [])
+
+    def version(self) -> Tuple[int, int]:
+        return (self.generation.value, self._events)
+
+    @property
+    def started(self) -> bool:
+        return self._thread is not None
+
+    def start(self, use_inotify: bool = True) -> None:
+        with self._lock:
+            if self._thread is not None:
+                return
+            target = self._run_poll
+            if use_inotify:
+                try:
+                    self._inotify = _Inotify()
+                    target = self._run_inotify
+                except (OSError, AttributeError):  # no inotify (non-Linux libc)
+                    pass
+            self.mode = "inotify" if target == self._run_inotify else "poll"
+            self._thread = threading.Thread(target=target, name="qod-store-watch", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _changed(self, path: pathlib.Path) -> None:
+        self._events += 1
+        for cb in self._watched[path]:
+            cb()
+
+    def _run_poll(self) -> None:
+        last = {p: _snapshot(p) for p in self._watched}
+        while not self._stop.wait(self.poll_interval):
+            for p in self._watched:
+                snap = _snapshot(p)
+                if snap != last[p]:
+                    last[p] = snap
+                    self._changed(p)
+
+    def _run_inotify(self) -> None:
+        ino = self._inotify
+        # wd -> {name in that directory (or None for "anything"): watched path}
+        by_wd: Dict[int, Dict[Optional[str], pathlib.Path]] = {}
+
+        def add(directory: pathlib.Path, name: Optional[str], target: pathlib.Path) -> None:
+            by_wd.setdefault(ino.add_watch(directory), {})[name] = target
+
+        for p in self._watched:
+            if p.is_dir():
+                add(p, None, p)
+            # files, and directories that may be created or replaced later
+            add(p.parent, p.name, p)
+        try:
+            while not self._stop.is_set():
+                ready, _, _ = select.select([ino.fd], [], [], 0.5)
+                if not ready:
+                    continue
+                hit = set()
+                for wd, name in ino.read():
+                    names = by_wd.get(wd, {})
+                    target = names.get(name) or names.get(None)
+                    if target is None:
+                        continue
+                    if name == target.name and target.is_dir():
+                        add(target, None, target)  # directory (re)created: watch inside it too
+                    hit.add(target)
+                for target in hit:
+                    self._changed(target)
+        finally:
+            ino.close()
@@ -0,0 +1,23 @@
+from facets import FacetIndex, split_tags
+from q2b import QUOTES, normalize
+
+def test_multi_tag_union_keeps_pool_order():
+    index = FacetIndex(QUOTES)
+    got = index.select(tags={"bible", "tech"})
+    assert got == [q for q in QUOTES if normalize(q["tag"]) in {"bible", "tech"}]
+
+def test_author_tokens_intersect():
+    index = FacetIndex(QUOTES)
+    assert {q["author"] for q in index.select(author="Les  BROWN")} == {"Les Brown"}
+    assert [q["text"] for q in index.select(tags=["bible"], author="john")] == ["Jesus wept."]
+    assert index.select(author="les abelson") == []
+
+def test_incremental_add():
+    index = FacetIndex(QUOTES)
+    qid = index.add({"text": "Be strong and courageous.", "author": "Joshua 1:9 (KJV)", "tag": "Bible"})
+    assert index.ids(tags=["bible"], author="joshua") == [qid]
+    assert "bible" in index.tags()
+
+def test_split_tags():
+    assert split_tags(" Bible, movies ,") == ["bible", "movies"]
+    assert split_tags("") is None
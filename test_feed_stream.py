@@ -0,0 +1,56 @@
+import datetime as dt
+import json
+
+import pytest
+
+pytest.importorskip("fastapi")
+from fastapi.testclient import TestClient
+
+import api_app
+from api_app import app, iter_feed_chunks, merged_pool, pick_for_date
+
+client = TestClient(app)
+
+def test_chunks_match_pick_for_date():
+    pool = merged_pool("both")
+    start, end = dt.date(2024, 12, 25), dt.date(2025, 3, 1)
+    got = []
+    for ordinals, picks in iter_feed_chunks(start, end, pool, chunk_days=7):
+        got.extend(zip(ordinals, picks))
+    assert len(got) == (end - start).days + 1
+    for o, q in got:
+        assert q is pick_for_date(dt.date.fromordinal(o), pool)
+
+def test_ndjson_streams_long_range(monkeypatch):
+    monkeypatch.setattr(api_app, "FEED_CHUNK_DAYS", 10)
+    r = client.get("/v1/feed", params={"start": "2024-01-01", "end": "2024-12-31", "format": "ndjson"})
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in r.text.splitlines()]
+    assert len(lines) == 366
+    assert lines[0]["date"] == "2024-01-01" and lines[-1]["date"] == "2024-12-31"
+    pick = client.get("/v1/pick", params={"date": "2024-07-04"}).json()
+    assert lines[185]["text"] == pick["text"]
+
+def test_ndjson_yields_one_body_chunk_per_chunk_days(monkeypatch):
+    monkeypatch.setattr(api_app, "FEED_CHUNK_DAYS", 10)
+    body = list(api_app.iter_feed_ndjson(dt.date(2024, 1, 1), dt.date(2024, 1, 25), merged_pool("both")))
+    assert [chunk.count(b"\n") for chunk in body] == [10, 10, 5]
+
+def test_feed_clamps_at_date_max():
+    r = client.get("/v1/feed", params={"start": "9999-12-30"})
+    assert r.status_code == 200 and r.json()["items"][-1]["date"] == "9999-12-31"
+    r = client.get("/v1/feed", params={"start": "9999-12-30", "format": "ndjson"})
+    assert r.status_code == 200 and len(r.text.splitlines()) == 2
+
+def test_json_feed_range_limit():
+    r = client.get("/v1/feed", params={"start": "2024-01-01", "end": "2024-03-01"})
+    assert r.status_code == 400
+    r = client.get("/v1/feed", params={"start": "2024-01-01", "days": 3})
+    assert [i["date"] for i in r.json()["items"]] == ["2024-01-01", "2024-01-02", "2024-01-03"]
+
+def test_tag_and_author_filters():
+    r = client.get("/v1/qod", params={"feed": "both", "tags": "movies,tech", "author": "linus"})
+    assert r.status_code == 200 and r.json()["author"] == "Linus Torvalds"
+    r = client.get("/v1/feed", params={"feed": "bible", "tags": "movies"})
+    assert r.status_code == 404
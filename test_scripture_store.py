@@ -0,0 +1,79 @@
+import pytest
+
+import scripture
+from moderation import lookup_reference, validate_quote
+
+VERSES = [
+    ("Genesis", 1, 1, "In the beginning God created the heaven and the earth."),
+    ("Genesis", 1, 2, "And the earth was without form, and void."),
+    ("John", 3, 16, "For God so loved the world, that he gave his only begotten Son, that whosoever believeth in him should not perish, but have everlasting life."),
+    ("John", 11, 35, "Jesus wept."),
+    ("1 John", 4, 8, "He that loveth not knoweth not God; for God is love."),
+]
+
+@pytest.fixture
+def kjv(tmp_path, monkeypatch):
+    monkeypatch.setattr(scripture, "SCRIPTURE_DIR", tmp_path)
+    scripture.build_store(VERSES, scripture.store_path("KJV"))
+    return scripture.get_store("KJV")
+
+def test_lookup(kjv):
+    assert kjv.lookup("john", 11, 35) == "Jesus wept."
+    assert kjv.lookup("1  John", 4, 8).endswith("God is love.")
+    assert kjv.lookup("John", 11, 36) is None
+    assert kjv.lookup("John", 12, 1) is None
+    assert kjv.lookup("Jude", 1, 1) is None
+
+def test_lookup_reference(kjv):
+    assert lookup_reference("Genesis 1:2 (KJV)") == VERSES[1][3]
+    assert lookup_reference("Genesis 1:2 (ESV)") is None  # translation not installed
+
+def test_rebuild_replaces_file_under_open_readers(kjv):
+    other_worker = scripture.ScriptureStore(kjv.path, "KJV")  # separate mapping of the old file
+    rows = VERSES + [("Psalms", c, 1, f"Psalm {c} verse one.") for c in range(1, 1500)]
+    scripture.build_store(rows, kjv.path)
+    assert other_worker.lookup("John", 11, 35) == "Jesus wept."
+    assert other_worker.lookup("Psalms", 1, 1) is None  # still reading the old file
+    assert kjv.lookup("Psalms", 1499, 1) == "Psalm 1499 verse one."  # closed; answered by the new store
+    assert scripture.get_store("KJV").lookup("Psalms", 2, 1) == "Psalm 2 verse one."
+    assert not list(kjv.path.parent.glob("*.tmp"))
+    other_worker.close()
+
+def test_reset_stores_closes_mappings(kjv):
+    scripture.reset_stores()
+    assert kjv._mm.closed
+    assert kjv.lookup("John", 11, 35) == "Jesus wept."  # reopened from disk
+    assert scripture.get_store("KJV") is not kjv
+
+def test_validate_against_verse(kjv):
+    ok, reasons = validate_quote({"text": "For God so loved the world...", "author": "John 3:16", "tag": "bible"})
+    assert ok, reasons
+    ok, reasons = validate_quote({"text": "world", "author": "John 3:16", "tag": "bible"})
+    assert not ok and any("does not match" in r for r in reasons)
+    ok, reasons = validate_quote({"text": "Jesus wept", "author": "John 11:35", "tag": "bible"})
+    assert ok, reasons
+    ok, reasons = validate_quote({"text": "Jesus laughed.", "author": "John 11:35 (KJV)", "tag": "bible"})
+    assert not ok and any("does not match" in r for r in reasons)
+    ok, reasons = validate_quote({"text": "Jesus wept.", "author": "John 11:99 (KJV)", "tag": "bible"})
+    assert not ok and any("no such verse" in r for r in reasons)
+
+def test_submit_reference_only(kjv):
+    pytest.importorskip("fastapi")
+    from fastapi.testclient import TestClient
+    from api_app import app
+
+    client = TestClient(app)
+    r = client.post("/v1/submit", params={"auto_store": False}, json={"author": "John 11:35", "tag": "bible"})
+    assert r.json()["accepted"] is True
+    r = client.post("/v1/submit", params={"auto_store": False}, json={"author": "John 11:36", "tag": "bible"})
+    assert r.json()["accepted"] is False
+
+def test_long_store_verse_is_not_too_long(kjv):
+    long_verse = "Then were the king's scribes called at that time. " * 11
+    scripture.build_store(VERSES + [("Esther", 8, 9, long_verse)], kjv.path)
+    verse = lookup_reference("Esther 8:9")
+    assert len(verse) > 500
+    ok, reasons = validate_quote({"text": verse, "author": "Esther 8:9", "tag": "bible"})
+    assert ok, reasons
+    ok, reasons = validate_quote({"text": verse + " Amen.", "author": "Esther 8:9", "tag": "bible"})
+    assert not ok and "text too long" in reasons
@@ -0,0 +1,93 @@
+import json
+import threading
+import time
+
+import pytest
+
+from store_watch import ChangeFeed, Generation, write_atomic
+
+def wait_for(cond, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if cond():
+            return True
+        time.sleep(0.01)
+    return False
+
+def test_generation_is_shared(tmp_path):
+    writer = Generation(tmp_path / "gen")
+    reader = Generation(tmp_path / "gen")  # separate mapping, as in another worker
+    assert reader.value == 0
+    writer.bump()
+    writer.bump()
+    assert reader.value == 2
+
+@pytest.mark.parametrize("use_inotify", [True, False])
+def test_change_feed_sees_external_writes(tmp_path, use_inotify):
+    store = tmp_path / "quotes_approved.json"
+    store.write_text("[]", encoding="utf-8")
+    data_dir = tmp_path / "scripture"
+    reloaded = []
+    feed = ChangeFeed(Generation(tmp_path / "gen"), poll_interval=0.02)
+    feed.watch(store)
+    feed.watch(data_dir, lambda: reloaded.append(True))
+    feed.start(use_inotify=use_inotify)
+    try:
+        time.sleep(0.1)
+        v0 = feed.version()
+        (tmp_path / "unrelated.txt").write_text("x")
+        store.write_text('[{"text": "t", "author": "a", "tag": "community"}]', encoding="utf-8")
+        assert wait_for(lambda: feed.version() != v0)
+
+        data_dir.mkdir()
+        (data_dir / "kjv.qsx").write_bytes(b"QSX1")
+        assert wait_for(lambda: reloaded)
+
+        v1 = feed.version()
+        feed.generation.bump()
+        assert feed.version()[0] == v1[0] + 1
+    finally:
+        feed.stop()
+
+def test_write_atomic_concurrent_writers(tmp_path):
+    target = tmp_path / "quotes_approved.json"
+    errors = []
+
+    def writer(n):
+        try:
+            for i in range(200):
+                write_atomic(target, f"[{n}, {i}]\n")
+        except Exception as e:  # pragma: no cover - reported below
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    assert json.loads(target.read_text())[1] == 199
+    assert [p.name for p in tmp_path.iterdir()] == ["quotes_approved.json"]
+
+def test_foreign_write_between_save_and_note_is_reloaded(tmp_path, monkeypatch):
+    pytest.importorskip("fastapi")
+    import api_app
+    import store_watch
+
+    store = tmp_path / "quotes_approved.json"
+    store.write_text("[]\n", encoding="utf-8")
+    monkeypatch.setattr(api_app, "APPROVED_PATH", store)
+    monkeypatch.setattr(api_app, "_pool_state", {"sig": None, "version": None, "approved": [], "index": None, "verses": None})
+    api_app.merged_pool("both")
+
+    ours = {"text": "Our own freshly submitted quote.", "author": "Worker One", "tag": "community"}
+    theirs = {"text": "A quote another worker stored right after us.", "author": "Worker Two", "tag": "community"}
+    approved = api_app.load_approved_quotes() + [ours]
+    sig = api_app.save_approved_quotes(approved)
+    # another process replaces the store before we get to index our append
+    store_watch.write_atomic(store, json.dumps(approved + [theirs]) + "\n")
+    store_watch.bump()
+    api_app._note_approved(approved, sig)
+
+    texts = [q["text"] for q in api_app.merged_pool("both")]
+    assert ours["text"] in texts and theirs["text"] in texts
@@ -0,0 +1,50 @@
+import json
+import threading
+import time
+
+import tracing
+
+def test_span_is_noop_without_trace():
+    with tracing.span("pool.load") as sp:
+        sp.set(items=1)
+    assert sp is tracing._NOOP
+
+def test_spans_nest_and_export(tmp_path):
+    with tracing.start_trace("job") as trace:
+        with tracing.span("pool.load", path="x.json"):
+            with tracing.span("pool.parse", bytes=10):
+                pass
+    root, = [s for s in trace.spans if s.name == "job"]
+    load, = [s for s in trace.spans if s.name == "pool.load"]
+    parse, = [s for s in trace.spans if s.name == "pool.parse"]
+    assert parse.parent_id == load.span_id and load.parent_id == root.span_id
+
+    chrome = json.loads(trace.write("chrome", tmp_path).read_text())
+    assert {e["name"] for e in chrome["traceEvents"]} == {"job", "pool.load", "pool.parse"}
+    otlp = json.loads(trace.write("otlp", tmp_path).read_text())
+    spans = otlp["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert all(s["traceId"] == trace.trace_id for s in spans)
+
+def busy(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+def test_sampling_profiler_only_samples_inside_spans(tmp_path):
+    other = threading.Thread(target=busy, args=(0.2,))  # another request's work
+    other.start()
+    with tracing.start_trace("slow") as trace:
+        with tracing.SamplingProfiler(trace, interval=0.001) as profiler:
+            busy(0.03)  # root span only: not sampled
+            with tracing.span("pool.parse"):
+                busy(0.05)
+    other.join()
+    stacks = list(profiler.samples)
+    assert stacks and all("test_sampling_profiler_only_samples_inside_spans" in st for st in stacks)
+    assert profiler.write(tmp_path).read_text().strip()
+
+def test_profile_header_token(monkeypatch):
+    monkeypatch.setattr(tracing, "ADMIN_TOKEN", "s3cret")
+    assert tracing.profile_requested("s3cret")
+    assert not tracing.profile_requested("s3cre")
+    assert not tracing.profile_requested(None)
@@ -0,0 +1,37 @@
+import pytest
+
+from verse_index import VerseIndex, merge_duplicates, verse_key
+
+QUOTES = [
+    {"text": "For God so loved the world...", "author": "John 3:16 (KJV)", "tag": "bible"},
+    {"text": "For God so loved the world.", "author": "John 3:16", "tag": "Bible"},
+    {"text": "For God so loved the world,", "author": "john  3:16 (ESV)", "tag": "bible"},
+    {"text": "Jesus wept.", "author": "John 11:35 (KJV)", "tag": "bible"},
+    {"text": "Talk is cheap.", "author": "Linus Torvalds", "tag": "community"},
+]
+
+def test_verse_key_formatting_variants():
+    assert verse_key(QUOTES[0]) == verse_key(QUOTES[1]) == ("john", 3, 16, "KJV")
+    assert verse_key(QUOTES[2]) == ("john", 3, 16, "ESV")
+    assert verse_key(QUOTES[2], "per_verse") == ("john", 3, 16)
+    assert verse_key(QUOTES[4]) is None
+
+@pytest.mark.parametrize("policy, dropped", [("per_translation", [(1, 0)]), ("per_verse", [(1, 0), (2, 0)])])
+def test_merge_duplicates(policy, dropped):
+    kept, merged = merge_duplicates(QUOTES, policy)
+    assert merged == [(d, QUOTES[f]) for d, f in dropped]
+    assert kept == [q for i, q in enumerate(QUOTES) if i not in {d for d, _ in dropped}]
+
+def test_merge_never_drops_builtins():
+    builtin = {"text": "Jesus wept.", "author": "John 11:35 (KJV)", "tag": "bible"}
+    approved = [{"text": "Jesus wept", "author": "john 11:35", "tag": "bible"}, QUOTES[4]]
+    kept, merged = merge_duplicates(approved, keep=[builtin])
+    assert kept == [QUOTES[4]]
+    assert merged == [(0, builtin)]
+
+def test_index_lookup():
+    index = VerseIndex(QUOTES[3:])
+    assert index.duplicate_of({"text": "x", "author": "John 11:35", "tag": "bible"}) == 0
+    assert index.duplicate_of(QUOTES[0]) is None
+    with pytest.raises(ValueError):
+        VerseIndex(policy="per_book")
@@ -0,0 +1,236 @@
+# tracing.py
+"""
+Opt-in tracing spans and slow-request sampling profiles, written as local files.
+
+    QOD_TRACE=chrome|otlp     write one trace per request (Chrome trace / OTLP-JSON)
+    QOD_TRACE_DIR=path        output directory (default ./traces)
+    QOD_PROFILE=1             sample-profile every request (admin flag)
+    QOD_ADMIN_TOKEN=secret    allow 'X-QOD-Profile: secret' to profile a single request
+    QOD_PROFILE_SLOW_MS=200   only keep profiles of requests at least this slow
+
+With no trace active, span() returns a shared no-op context manager.
+"""
+import collections
+import contextvars
+import hmac
+import json
+import os
+import pathlib
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+BASE_DIR = pathlib.Path(__file__).parent.resolve()
+
+TRACE_FORMAT = (os.environ.get("QOD_TRACE") or "").lower() or None
+TRACE_DIR = pathlib.Path(os.environ.get("QOD_TRACE_DIR") or BASE_DIR / "traces")
+PROFILE_ALL = os.environ.get("QOD_PROFILE") == "1"
+ADMIN_TOKEN = os.environ.get("QOD_ADMIN_TOKEN") or None
+PROFILE_SLOW_MS = float(os.environ.get("QOD_PROFILE_SLOW_MS") or 200)
+PROFILE_INTERVAL_S = 0.005
+
+TRACE_FORMATS = ("chrome", "otlp")
+if TRACE_FORMAT is not None and TRACE_FORMAT not in TRACE_FORMATS:
+    raise ValueError(f"QOD_TRACE must be one of {', '.join(TRACE_FORMATS)}, got '{TRACE_FORMAT}'")
+
+def enabled() -> bool:
+    """True if tracing or profiling can be switched on at all in this process."""
+    return bool(TRACE_FORMAT or PROFILE_ALL or ADMIN_TOKEN)
+
+def profile_requested(header_value: Optional[str]) -> bool:
+    if PROFILE_ALL:
+        return True
+    if ADMIN_TOKEN is None or header_value is None:
+        return False
+    return hmac.compare_digest(header_value.encode("utf-8"), ADMIN_TOKEN.encode("utf-8"))
+
+_current_trace: contextvars.ContextVar = contextvars.ContextVar("qod_trace", default=None)
+_current_span: contextvars.ContextVar = contextvars.ContextVar("qod_span", default=None)
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs) -> None:
+        pass
+
+_NOOP = _NoopSpan()
+
+class Span:
+    __slots__ = ("trace", "name", "attrs", "sampled", "span_id", "parent_id", "thread_id", "start_ns", "end_ns", "_token")
+
+    def __init__(self, trace: "Trace", name: str, attrs: Dict, sampled: bool = True):
+        self.trace = trace
+        self.name = name
+        self.attrs = attrs
+        self.sampled = sampled
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id: Optional[str] = None
+        self.thread_id = 0
+        self.start_ns = self.end_ns = 0
+
+    def set(self, **attrs) -> None:
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        parent = _current_span.get()
+        self.parent_id = parent.span_id if parent is not None else None
+        self.thread_id = threading.get_ident()
+        if self.sampled:
+            active = self.trace.active
+            active[self.thread_id] = active.get(self.thread_id, 0) + 1
+        self._token = _current_span.set(self)
+        self.start_ns = time.time_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end_ns = time.time_ns()
+        _current_span.reset(self._token)
+        if self.sampled:
+            self.trace.active[self.thread_id] -= 1
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        self.trace.spans.append(self)
+        return False
+
+def span(name: str, **attrs):
+    """Time a named stage: `with tracing.span("store.save", items=n): ...`"""
+    trace = _current_trace.get()
+    if trace is None:
+        return _NOOP
+    return Span(trace, name, attrs)
+
+class Trace:
+    def __init__(self, name: str):
+        self.name = name
+        self.trace_id = uuid.uuid4().hex
+        self.spans: List[Span] = []
+        # thread id -> number of open sampled spans of this trace on that thread
+        self.active: Dict[int, int] = {}
+
+    def to_chrome(self) -> dict:
+        pid = os.getpid()
+        return {
+            "traceEvents": [
+                {
+                    "name": s.name,
+                    "cat": "qod",
+                    "ph": "X",
+                    "ts": s.start_ns / 1000,
+                    "dur": (s.end_ns - s.start_ns) / 1000,
+                    "pid": pid,
+                    "tid": s.thread_id,
+                    "args": s.attrs,
+                }
+                for s in self.spans
+            ],
+            "displayTimeUnit": "ms",
+        }
+
+    def to_otlp(self) -> dict:
+        def attr(k, v):
+            if isinstance(v, bool):
+                return {"key": k, "value": {"boolValue": v}}
+            if isinstance(v, int):
+                return {"key": k, "value": {"intValue": str(v)}}
+            if isinstance(v, float):
+                return {"key": k, "value": {"doubleValue": v}}
+            return {"key": k, "value": {"stringValue": str(v)}}
+
+        spans = []
+        for s in self.spans:
+            item = {
+                "traceId": self.trace_id,
+                "spanId": s.span_id,
+                "name": s.name,
+                "kind": 1,
+                "startTimeUnixNano": str(s.start_ns),
+                "endTimeUnixNano": str(s.end_ns),
+                "attributes": [attr(k, v) for k, v in s.attrs.items()],
+            }
+            if s.parent_id:
+                item["parentSpanId"] = s.parent_id
+            spans.append(item)
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [attr("service.name", "qod-bible")]},
+                "scopeSpans": [{"scope": {"name": "qod.tracing"}, "spans": spans}],
+            }]
+        }
+
+    def write(self, fmt: str, directory: pathlib.Path = None) -> pathlib.Path:
+        directory = directory or TRACE_DIR
+        directory.mkdir(parents=True, exist_ok=True)
+        data = self.to_chrome() if fmt == "chrome" else self.to_otlp()
+        path = directory / f"{self.name}-{self.trace_id}.{fmt}.json"
+        path.write_text(json.dumps(data), encoding="utf-8")
+        return path
+
+@contextmanager
+def start_trace(name: str, **attrs) -> Iterator[Trace]:
+    """Collect spans for the enclosed work (and anything it runs with this context) under one root span."""
+    trace = Trace(name)
+    token = _current_trace.set(trace)
+    try:
+        # The root span lives on the event loop thread, which interleaves other
+        # requests, so it is timed but never sampled.
+        with Span(trace, name, attrs, sampled=False):
+            yield trace
+    finally:
+        _current_trace.reset(token)
+
+class SamplingProfiler:
+    """
+    Background thread sampling the stacks of threads while they are inside one of
+    the trace's (non-root) spans, aggregated as folded stacks ('a;b;c count') for
+    flamegraph tools. Stages are synchronous, so a thread inside a span is working
+    on this request; time spent outside any span is not sampled. Samples are taken
+    when the sampler thread gets the GIL, so spans much shorter than the interval
+    are under-represented.
+    """
+
+    def __init__(self, trace: Trace, interval: float = PROFILE_INTERVAL_S):
+        self.trace = trace
+        self.interval = interval
+        self.samples: collections.Counter = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="qod-profiler", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for tid, depth in list(self.trace.active.items()):
+                if not depth:
+                    continue
+                frame = frames.get(tid)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{pathlib.Path(code.co_filename).name}:{code.co_name}:{frame.f_lineno}")
+                    frame = frame.f_back
+                if stack:
+                    self.samples[";".join(reversed(stack))] += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+    def write(self, directory: pathlib.Path = None) -> pathlib.Path:
+        directory = directory or TRACE_DIR
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"{self.trace.name}-{self.trace.trace_id}.folded"
+        path.write_text("".join(f"{stack} {n}\n" for stack, n in self.samples.most_common()), encoding="utf-8")
+        return path
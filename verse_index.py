@@ -0,0 +1,89 @@
+# verse_index.py
+"""
+Canonical verse-level dedupe for bible quotes.
+
+"John 3:16 (KJV)", "John 3:16" and "john  3:16 (KJV)" all parse to the same
+(book, chapter, verse); the policy decides whether the translation is part of
+the key:
+
+    per_translation   one quote per verse per translation (no translation = KJV)
+    per_verse         one quote per verse, whatever the translation
+
+Set the default with QOD_VERSE_DEDUPE.
+"""
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from moderation import normalize, parse_scripture_reference
+from scripture import DEFAULT_TRANSLATION
+
+POLICIES = ("per_translation", "per_verse")
+VERSE_DEDUPE_POLICY = os.environ.get("QOD_VERSE_DEDUPE") or "per_translation"
+if VERSE_DEDUPE_POLICY not in POLICIES:
+    raise ValueError(f"QOD_VERSE_DEDUPE must be one of {', '.join(POLICIES)}, got '{VERSE_DEDUPE_POLICY}'")
+
+def verse_key(q: Dict, policy: str = VERSE_DEDUPE_POLICY) -> Optional[Tuple]:
+    """Canonical key for a bible quote, or None if it is not one (or its reference does not parse)."""
+    if normalize(q.get("tag", "")) != "bible":
+        return None
+    parsed = parse_scripture_reference(q.get("author", ""))
+    if not parsed:
+        return None
+    book, chap, verse, trans = parsed
+    if policy == "per_verse":
+        return (book, chap, verse)
+    return (book, chap, verse, (trans or DEFAULT_TRANSLATION).upper())
+
+class VerseIndex:
+    """Canonical verse key -> position of the first quote with that key, for O(1) duplicate checks."""
+
+    def __init__(self, quotes: Iterable[Dict] = (), policy: str = VERSE_DEDUPE_POLICY):
+        if policy not in POLICIES:
+            raise ValueError(f"unknown verse dedupe policy: '{policy}'")
+        self.policy = policy
+        self._first: Dict[Tuple, int] = {}
+        self._count = 0
+        self.extend(quotes)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def duplicate_of(self, q: Dict) -> Optional[int]:
+        """Position of an earlier quote for the same verse, if any."""
+        key = verse_key(q, self.policy)
+        return None if key is None else self._first.get(key)
+
+    def add(self, q: Dict) -> int:
+        pos = self._count
+        self._count += 1
+        key = verse_key(q, self.policy)
+        if key is not None:
+            self._first.setdefault(key, pos)
+        return pos
+
+    def extend(self, quotes: Iterable[Dict]) -> None:
+        for q in quotes:
+            self.add(q)
+
+def merge_duplicates(
+    quotes: List[Dict],
+    policy: str = VERSE_DEDUPE_POLICY,
+    keep: Iterable[Dict] = (),
+) -> Tuple[List[Dict], List[Tuple[int, Dict]]]:
+    """
+    Keep the first quote for each verse (rotation order is preserved). Quotes in
+    `keep` (the built-ins) always win and are never dropped.
+    Return (kept quotes, [(dropped position in quotes, the quote it duplicates), ...]).
+    """
+    keep = list(keep)
+    index = VerseIndex(keep, policy=policy)
+    kept: List[Dict] = []
+    merged: List[Tuple[int, Dict]] = []
+    for pos, q in enumerate(quotes):
+        first = index.duplicate_of(q)
+        index.add(q)
+        if first is not None:
+            merged.append((pos, keep[first] if first < len(keep) else quotes[first - len(keep)]))
+        else:
+            kept.append(q)
+    return kept, merged